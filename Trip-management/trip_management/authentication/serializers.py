@@ -21,7 +21,7 @@ class UserSerializer(serializers.ModelSerializer):
         extra_kwargs = {"password": {"write_only": True}}
 
     def create(self, validated_data):
-        """Creates user object and saves and returns it.
+        """Creates user object with hashed password in a single insert and returns it.
 
         Args:
             validated_data (dictionary): dictionary of user data
@@ -29,16 +29,14 @@ class UserSerializer(serializers.ModelSerializer):
         Returns:
             Object: user object
         """
-        user = Users.objects.create(
+        return Users.objects.create_user(
             username=validated_data["username"],
             email=validated_data["email"],
+            password=validated_data["password"],
             first_name=validated_data["first_name"],
             last_name=validated_data["last_name"],
             department=validated_data["department"],
         )
-        user.set_password(validated_data["password"])
-        user.save()
-        return user
 
 
 class ProfileUpdateSerializer(serializers.ModelSerializer):
@@ -61,8 +59,17 @@ class ProfileUpdateSerializer(serializers.ModelSerializer):
         instance.username = validated_data.get("username", instance.username)
         instance.first_name = validated_data.get("first_name", instance.first_name)
         instance.last_name = validated_data.get("last_name", instance.last_name)
-        instance.department = validated_data.get("department", instance.department)
-        instance.save()
+        if "department" in validated_data:
+            instance.department_id = validated_data["department"].id
+        instance.save(
+            update_fields=[
+                "username",
+                "first_name",
+                "last_name",
+                "department",
+                "modified_at",
+            ]
+        )
         return instance
 
 
@@ -0,0 +1,11 @@
+from celery import shared_task
+from django.core.mail import send_mail
+
+
+@shared_task(name="password_otp_email")
+def send_otp_email(email, otp):
+    """Sends password reset otp to the given email. Queued by password otp api so that request doesn't wait on SMTP."""
+    subject = "Password Reset Requested"
+    message = f"Your OTP for resetting password is {otp}"
+    from_email = "noreply@example.com"
+    send_mail(subject, message, from_email, [email], fail_silently=False)
@@ -1,5 +1,4 @@
 from django.core.cache import cache
-from django.core.mail import send_mail
 from django.shortcuts import get_object_or_404
 from django.utils.crypto import get_random_string
 from rest_framework import generics, permissions, status
@@ -8,6 +7,7 @@ from rest_framework.views import APIView
 from rest_framework_simplejwt.authentication import JWTAuthentication
 
 from .models import Users
+from .tasks import send_otp_email
 from .serializers import (
     ChangePasswordSerializer,
     PasswordResetRequestSerializer,
@@ -49,11 +49,10 @@ class Profile(APIView):
         Returns:
             _type_: Updated user object OR error object
         """
-        username = request.user.username
-        instance = Users.objects.get(username=username)
+        instance = request.user
         serializer = ProfileUpdateSerializer(instance, data=request.data)
         if serializer.is_valid():
-            serializer.update(instance, serializer.validated_data)
+            serializer.save()
             return Response(serializer.data)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
@@ -67,8 +66,6 @@ class Profile(APIView):
             _type_: success or error message
         """
         user = self.request.user
-        username = user.username
-        user = Users.objects.filter(username=username).first()
         if user:
             user.delete()
             return Response(
@@ -86,7 +83,7 @@ class PasswordOtpApi(APIView):
     serializer_class = PasswordResetRequestSerializer
 
     def post(self, request):
-        """Takes user email and sends random generated otp on it and stores it in cache.
+        """Takes user email, stores random generated otp in cache and queues email to send it.
 
         Args:
             request (JSON): user email
@@ -98,17 +95,10 @@ class PasswordOtpApi(APIView):
         serializer.is_valid(raise_exception=True)
 
         email = serializer.validated_data["email"]
-        user = get_object_or_404(Users, email=email)
-
         otp = get_random_string(length=6, allowed_chars="0123456789")
 
-        subject = "Password Reset Requested"
-        message = f"Your OTP for resetting password is {otp}"
-        from_email = "noreply@example.com"
-        recipient_list = [user.email]
-        send_mail(subject, message, from_email, recipient_list, fail_silently=False)
-
         cache.set(f"password_reset_otp:{email}", otp, timeout=900)
+        send_otp_email.delay(email, otp)
 
         return Response(
             {"message": "Password reset email sent"}, status=status.HTTP_200_OK
@@ -138,9 +128,11 @@ class ResetPassword(APIView):
         cached_otp = cache.get(f"password_reset_otp:{email}")
         if cached_otp:
             if cached_otp == otp:
-                user = get_object_or_404(Users, email=email)
+                user = get_object_or_404(
+                    Users.objects.only("id", "password"), email=email
+                )
                 user.set_password(password)
-                user.save()
+                user.save(update_fields=["password", "modified_at"])
                 cache.delete(f"password_reset_otp:{email}")
                 return Response(
                     {"message": "Password reset success"}, status=status.HTTP_200_OK
@@ -157,18 +149,12 @@ class ChangePassword(generics.UpdateAPIView):
     serializer_class = ChangePasswordSerializer
 
     def get_object(self):
-        """Fetch user object for given username
+        """Fetch user object of requesting user authenticated by JWT
 
         Returns:
             _type_: user object
         """
-        user = self.request.user
-        username = user.username
-        try:
-            user = Users.objects.get(username=username)
-            return user
-        except Users.DoesNotExist:
-            return None
+        return self.request.user
 
     def put(self, request):
         """verifies current password and sets new password
@@ -188,7 +174,7 @@ class ChangePassword(generics.UpdateAPIView):
             new_password = serializer.validated_data["new_password"]
 
             user_profile.set_password(new_password)
-            user_profile.save()
+            user_profile.save(update_fields=["password", "modified_at"])
 
             return Response({"message": "Password updated successfully."})
 
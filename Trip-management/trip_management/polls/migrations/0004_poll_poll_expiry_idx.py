@@ -0,0 +1,16 @@
+# Generated by Django 4.1.7 on 2026-10-15 10:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("polls", "0003_alter_vote_unique_together"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="poll",
+            index=models.Index(fields=["expiry"], name="poll_expiry_idx"),
+        ),
+    ]
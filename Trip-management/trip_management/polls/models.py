@@ -12,6 +12,9 @@ class Poll(BaseModel):
     
     db_table = 'polls'
 
+    class Meta:
+        indexes = [models.Index(fields=["expiry"], name="poll_expiry_idx")]
+
 
 class Choice(BaseModel):
     """stores choices for each poll"""
@@ -1,5 +1,7 @@
 from rest_framework.permissions import IsAuthenticated
 
 class IsCreator(IsAuthenticated):
+    message = "You are not the creator of the poll"
+
     def has_object_permission(self, request, view, obj):
-        return obj.created_by == request.user
+        return obj.created_by_id == request.user.id
@@ -1,4 +1,5 @@
-from datetime import datetime
+from django.db.models import Sum
+from django.utils import timezone
 from rest_framework import serializers
 from .models import Choice, Poll, Vote
 from authentication.models import Users, Department
@@ -17,15 +18,21 @@ class ChoiceSerializer(serializers.ModelSerializer):
         """Takes vote counts and calculates percentage of each of them based on counts.
 
         Args:
-            obj (object): gets poll object to extract choices from it
+            obj (object): gets choice object to calculate its share of poll votes
 
         Returns:
             int: returns vote percent or default zero  
         """        
-        choices = obj.poll.choices.all()
-        total_votes = 0
-        for i in choices:
-            total_votes += i.votes
+        poll_totals = self.context.setdefault("poll_totals", {})
+        total_votes = poll_totals.get(obj.poll_id)
+        if total_votes is None:
+            total_votes = (
+                Choice.objects.filter(poll_id=obj.poll_id).aggregate(
+                    total=Sum("votes")
+                )["total"]
+                or 0
+            )
+            poll_totals[obj.poll_id] = total_votes
         if total_votes:
             return round(obj.votes / total_votes * 100, 2)
         else:
@@ -51,6 +58,25 @@ class PollSerializer(serializers.ModelSerializer):
         fields = ("id", "title", "department", "expiry", "choices", "created_by")
         read_only_fields = ["id", "created_by"]
 
+    def to_representation(self, instance):
+        """Adds total votes of poll to context once so that choices can calculate percentage without querying.
+        Uses total_votes annotated by the views, else sums votes of choices already loaded on the poll.
+
+        Args:
+            instance (object): poll object
+
+        Returns:
+            dictionary: serialized poll
+        """
+        total_votes = getattr(instance, "total_votes", None)
+        if total_votes is None and "choices" in getattr(
+            instance, "_prefetched_objects_cache", {}
+        ):
+            total_votes = sum(choice.votes for choice in instance.choices.all())
+        if total_votes is not None:
+            self.context.setdefault("poll_totals", {})[instance.id] = total_votes
+        return super().to_representation(instance)
+
     def get_user_choice(self, obj):
         """fetches user's voted choice
 
@@ -75,11 +101,9 @@ class PollSerializer(serializers.ModelSerializer):
         Returns:
             date:valid expiry date
         """        
-        expiry = self.initial_data.get("expiry")
-        expiry = datetime.strptime(expiry, "%Y-%m-%dT%H:%M:%SZ")
-        if expiry <= datetime.now():
+        if data <= timezone.now():
             raise serializers.ValidationError("Expiry date must be in the future")
-        return expiry
+        return data
 
     def create(self, validated_data):
         """creates poll and choices object to add given data
@@ -93,11 +117,10 @@ class PollSerializer(serializers.ModelSerializer):
         departments_data = validated_data.pop("department", [])
         choices_data = validated_data.pop("choices", [])
         poll = Poll.objects.create(**validated_data)
-        for choice_data in choices_data:
-            Choice.objects.create(poll=poll, **choice_data)
-
-        for department_data in departments_data:
-            poll.department.add(department_data)
+        Choice.objects.bulk_create(
+            [Choice(poll=poll, **choice_data) for choice_data in choices_data]
+        )
+        poll.department.set(departments_data)
 
         return poll
 
@@ -118,21 +141,36 @@ class PollSerializer(serializers.ModelSerializer):
         if validated_data.get("department"):
             instance.department.set(validated_data.get("department", []))
         expiry = validated_data.get("expiry")
-        if expiry <= datetime.now():
+        if expiry and expiry <= timezone.now():
             raise serializers.ValidationError("Expiry date must be in the future")
         instance.expiry = expiry or instance.expiry
         title = validated_data.get("title")
         instance.title = title or instance.title
 
+        existing_choices = instance.choices.in_bulk(
+            [choice_data["id"] for choice_data in choices_data if choice_data.get("id")]
+        )
+        updated_choices = []
+        new_choices = []
+        now = timezone.now()
         for choice_data in choices_data:
             choice_id = choice_data.get("id", None)
             if choice_id:
-                choice = Choice.objects.get(id=choice_id, poll=instance)
+                choice = existing_choices.get(int(choice_id))
+                if choice is None:
+                    raise serializers.ValidationError("Invalid choice id")
                 choice.choice_text = choice_data.get("choice_text", choice.choice_text)
                 choice.votes = 0
-                choice.save()
+                choice.modified_at = now
+                updated_choices.append(choice)
             else:
-                Choice.objects.create(poll=instance, **choice_data)
+                new_choices.append(Choice(poll=instance, **choice_data))
+        Choice.objects.bulk_update(
+            updated_choices, ["choice_text", "votes", "modified_at"]
+        )
+        Choice.objects.bulk_create(new_choices)
+        if hasattr(instance, "total_votes"):
+            del instance.total_votes
         if expiry or title:
             instance.save()
         return instance
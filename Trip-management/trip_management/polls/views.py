@@ -1,18 +1,91 @@
 from django.shortcuts import get_object_or_404, render
 
 from rest_framework_simplejwt.authentication import JWTAuthentication
-from rest_framework import generics, permissions
+from rest_framework import generics, permissions, serializers
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.views import APIView
 
-from datetime import datetime
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Case, F, Sum, When
+from django.utils import timezone
 
 from .models import Poll, Choice, Vote
 from authentication.models import Users, Department
 from .serializers import PollSerializer, ChoiceSerializer
 from .permissions import IsCreator
 
+POLLS_CACHE_TIMEOUT = 30
+POLLS_CACHE_VERSION_KEY = "polls:version"
+
+
+def polls_cache_key(department_id, query_string):
+    """Builds cache key of polls list for a department, versioned so that any poll or vote write expires all of them.
+
+    Args:
+        department_id (int): department id of requesting user
+        query_string (string): encoded query parameters such as page number
+
+    Returns:
+        string: cache key
+    """
+    version = cache.get_or_set(POLLS_CACHE_VERSION_KEY, 1, timeout=None)
+    return f"polls:dept:{department_id}:v{version}:{query_string}"
+
+
+def invalidate_polls_cache():
+    """Bumps polls cache version so that cached poll lists of every department are ignored."""
+    try:
+        cache.incr(POLLS_CACHE_VERSION_KEY)
+    except ValueError:
+        cache.set(POLLS_CACHE_VERSION_KEY, 1, timeout=None)
+
+
+def build_poll_rows(polls):
+    """Builds poll response from plain rows, fetching choices and departments of all the polls in one query each.
+
+    Args:
+        polls (list): poll dictionaries having id, title, expiry and created_by
+
+    Returns:
+        list: poll data with departments and choices along with their vote percentage
+    """
+    poll_ids = [poll["id"] for poll in polls]
+    choices_by_poll = {}
+    for choice in (
+        Choice.objects.filter(poll_id__in=poll_ids)
+        .order_by("id")
+        .values("id", "poll_id", "choice_text", "votes")
+    ):
+        choices_by_poll.setdefault(choice.pop("poll_id"), []).append(choice)
+    departments_by_poll = {}
+    for poll_id, department_id in Poll.department.through.objects.filter(
+        poll_id__in=poll_ids
+    ).values_list("poll_id", "department_id"):
+        departments_by_poll.setdefault(poll_id, []).append(department_id)
+
+    expiry_field = serializers.DateTimeField()
+    rows = []
+    for poll in polls:
+        choices = choices_by_poll.get(poll["id"], [])
+        total_votes = sum(choice["votes"] for choice in choices)
+        for choice in choices:
+            choice["percentage"] = (
+                round(choice["votes"] / total_votes * 100, 2) if total_votes else 0.0
+            )
+        rows.append(
+            {
+                "id": poll["id"],
+                "title": poll["title"],
+                "department": departments_by_poll.get(poll["id"], []),
+                "expiry": expiry_field.to_representation(poll["expiry"]),
+                "choices": choices,
+                "created_by": poll["created_by"],
+            }
+        )
+    return rows
+
 
 class Polls(generics.ListAPIView):
     """For creating and listing polls."""
@@ -29,10 +102,9 @@ class Polls(generics.ListAPIView):
             Objects: matching poll objects
         """
         user = self.request.user
-        department_id = user.department
         return Poll.objects.filter(
-            department=department_id, expiry__gt=datetime.now()
-        ).prefetch_related("choices")
+            department=user.department_id, expiry__gt=timezone.now()
+        ).order_by("id")
 
     def get_serializer_context(self):
         """Takes all the context data from parent class and adds department_id to the dictionary
@@ -45,14 +117,25 @@ class Polls(generics.ListAPIView):
         return context
 
     def list(self, request, *args, **kwargs):
-        """Intantiate serializer for all the objects in queryset
+        """Returns polls of user's department from cache and caches them for short time if not found.
+        Polls are read as plain rows instead of model objects as this is the most frequently hit listing.
 
         Returns:
-            JSON: serializer data
+            JSON: Poll data
         """
-        queryset = self.get_queryset()
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+        cache_key = polls_cache_key(
+            request.user.department_id, request.query_params.urlencode()
+        )
+        data = cache.get(cache_key)
+        if data is None:
+            polls = self.get_queryset().values("id", "title", "expiry", "created_by")
+            page = self.paginate_queryset(polls)
+            if page is not None:
+                data = self.get_paginated_response(build_poll_rows(page)).data
+            else:
+                data = build_poll_rows(list(polls))
+            cache.set(cache_key, data, timeout=POLLS_CACHE_TIMEOUT)
+        return Response(data)
 
     def post(self, request):
         """gets poll data and serializes it to save it.
@@ -66,6 +149,7 @@ class Polls(generics.ListAPIView):
         serializer = self.serializer_class(data=request.data)
         if serializer.is_valid():
             serializer.save(created_by=request.user)
+            invalidate_polls_cache()
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
@@ -84,27 +168,35 @@ class MyPolls(generics.ListAPIView):
             Objects: poll objects with their respective choices
         """
         user = self.request.user
-        return Poll.objects.filter(created_by=user).prefetch_related("choices")
-
-    def list(self, request, *args, **kwargs):
-        """Serialize all the poll objects and returns them
-
-        Returns:
-            JSON: Poll data
-        """
-        queryset = self.get_queryset()
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+        return (
+            Poll.objects.filter(created_by=user)
+            .annotate(total_votes=Sum("choices__votes"))
+            .prefetch_related("choices", "department")
+            .order_by("id")
+        )
 
 
 class PollDetail(generics.RetrieveUpdateAPIView, generics.DestroyAPIView):
     """To get detail view of poll, update poll and delete."""
 
-    queryset = Poll.objects.all()
+    queryset = (
+        Poll.objects.annotate(total_votes=Sum("choices__votes"))
+        .prefetch_related("choices", "department")
+    )
     serializer_class = PollSerializer
     authentication_classes = [JWTAuthentication]
     permission_classes = [permissions.IsAuthenticated, IsCreator]
 
+    def get_queryset(self):
+        """skips the read-path annotations and prefetches when the poll is only being deleted.
+
+        Returns:
+            Object: poll queryset
+        """
+        if self.request.method == "DELETE":
+            return Poll.objects.only("id", "created_by")
+        return super().get_queryset()
+
     def get_serializer_context(self):
         """returns poll data based on poll id.
 
@@ -115,8 +207,17 @@ class PollDetail(generics.RetrieveUpdateAPIView, generics.DestroyAPIView):
         context["request"] = self.request
         return context
 
+    def perform_update(self, serializer):
+        """saves updated poll and expires cached poll lists.
+
+        Args:
+            serializer (object): validated poll data
+        """
+        serializer.save()
+        invalidate_polls_cache()
+
     def destroy(self, request, *args, **kwargs):
-        """deletes poll and its respective choices based on poll id in kwargs
+        """deletes poll based on poll id in kwargs, its choices are deleted by cascade
 
         kwargs:
             request (keyword argument): poll_id
@@ -124,25 +225,10 @@ class PollDetail(generics.RetrieveUpdateAPIView, generics.DestroyAPIView):
         Returns:
             JSON: success or error message for deletion
         """
-        poll_id = kwargs.get("pk")
-        poll = get_object_or_404(Poll, pk=poll_id)
-        if poll.created_by == request.user:
-            try:
-                choice = Choice.objects.filter(poll=poll)
-                choice.delete()
-                poll.delete()
-                return Response(
-                    {"detail": "Poll deleted"}, status=status.HTTP_204_NO_CONTENT
-                )
-            except:
-                return Response(
-                    {"detail": "Poll not found"}, status=status.HTTP_404_NOT_FOUND
-                )
-        else:
-            return Response(
-                {"detail": "You are not the creator of the poll"},
-                status=status.HTTP_403_FORBIDDEN,
-            )
+        poll = self.get_object()
+        poll.delete()
+        invalidate_polls_cache()
+        return Response({"detail": "Poll deleted"}, status=status.HTTP_204_NO_CONTENT)
 
 
 class VoteAPI(APIView):
@@ -161,40 +247,50 @@ class VoteAPI(APIView):
             JSON: vote added or removed or updated message or error message
         """
         choice_id = kwargs.get("pk")
-        choice = get_object_or_404(Choice, pk=choice_id)
+        choice = get_object_or_404(
+            Choice.objects.select_related("poll").prefetch_related("poll__department"),
+            pk=choice_id,
+        )
         poll = choice.poll
         user = request.user
-        poll_departments = poll.department.all()
-        if user.department in poll_departments:
-            try:
-                vote = Vote.objects.get(user=request.user, choice__poll=poll)
-                if vote.choice == choice:
-                    vote.delete()
-                    choice.votes -= 1
-                    choice.save()
-                    return Response(
-                        {"detail": "Vote removed."}, status=status.HTTP_200_OK
+        poll_department_ids = {department.id for department in poll.department.all()}
+        if user.department_id in poll_department_ids:
+            with transaction.atomic():
+                transaction.on_commit(invalidate_polls_cache)
+                try:
+                    vote = Vote.objects.get(user=request.user, choice__poll=poll)
+                    if vote.choice_id == choice.id:
+                        vote.delete()
+                        Choice.objects.filter(pk=choice.pk).update(
+                            votes=F("votes") - 1, modified_at=timezone.now()
+                        )
+                        return Response(
+                            {"detail": "Vote removed."}, status=status.HTTP_200_OK
+                        )
+                    else:
+                        old_choice_id = vote.choice_id
+                        vote.choice = choice
+                        vote.save(update_fields=["choice", "modified_at"])
+                        Choice.objects.filter(
+                            pk__in=[old_choice_id, choice.pk]
+                        ).update(
+                            votes=Case(
+                                When(pk=old_choice_id, then=F("votes") - 1),
+                                When(pk=choice.pk, then=F("votes") + 1),
+                            ),
+                            modified_at=timezone.now(),
+                        )
+                        return Response(
+                            {"detail": "Vote updated."}, status=status.HTTP_200_OK
+                        )
+                except Vote.DoesNotExist:
+                    Vote.objects.create(user=request.user, choice=choice)
+                    Choice.objects.filter(pk=choice.pk).update(
+                        votes=F("votes") + 1, modified_at=timezone.now()
                     )
-                else:
-                    # breakpoint()
-                    old_choice = vote.choice
-                    vote.choice = choice
-                    vote.save()
-                    old_choice.votes -= 1
-                    old_choice.save()
-                    choice.votes += 1
-                    choice.save()
                     return Response(
-                        {"detail": "Vote updated."}, status=status.HTTP_200_OK
+                        {"detail": "Vote added."}, status=status.HTTP_201_CREATED
                     )
-            except Vote.DoesNotExist:
-                vote = Vote(user=request.user, choice=choice)
-                vote.save()
-                choice.votes += 1
-                choice.save()
-                return Response(
-                    {"detail": "Vote added."}, status=status.HTTP_201_CREATED
-                )
         return Response(
             {"message": "You are not authorized to vote in poll"},
             status=status.HTTP_400_BAD_REQUEST,
@@ -0,0 +1,29 @@
+import orjson
+from rest_framework.renderers import BaseRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+
+class ORJSONRenderer(BaseRenderer):
+    """Renders response data to JSON using orjson instead of the stdlib encoder"""
+
+    media_type = "application/json"
+    format = "json"
+    charset = None
+    encoder = JSONEncoder()
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        """serializes data to JSON bytes, falling back to DRF's encoder for types orjson does not know.
+
+        Args:
+            data (object): response data to be rendered.
+
+        Returns:
+            bytes: JSON encoded data.
+        """
+        if data is None:
+            return b""
+        return orjson.dumps(
+            data,
+            default=self.encoder.default,
+            option=orjson.OPT_NAIVE_UTC | orjson.OPT_NON_STR_KEYS,
+        )
@@ -0,0 +1,16 @@
+# Generated by Django 4.1.7 on 2026-10-15 11:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("trips", "0011_trip_splitwise_group"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="trip",
+            index=models.Index(fields=["start_date"], name="trip_start_date_idx"),
+        ),
+    ]
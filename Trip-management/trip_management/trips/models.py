@@ -21,6 +21,7 @@ class Trip(BaseModel):
     class Meta:
         verbose_name = "trips"
         db_table = "trips"
+        indexes = [models.Index(fields=["start_date"], name="trip_start_date_idx")]
 
 
 class Attachments(models.Model):
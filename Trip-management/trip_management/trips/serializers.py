@@ -1,4 +1,5 @@
-from datetime import datetime
+from django.db import transaction
+from django.utils import timezone
 from .models import Trip, Attachments, TripUsers
 from authentication.models import Users, Department
 from rest_framework import serializers
@@ -18,7 +19,7 @@ class TripSerializer(serializers.ModelSerializer):
         write_only=True,
     )
     departments = serializers.PrimaryKeyRelatedField(
-        queryset=Department.objects.all(), many=True
+        queryset=Department.objects.only("id"), many=True
     )
 
     class Meta:
@@ -36,47 +37,30 @@ class TripSerializer(serializers.ModelSerializer):
         )
         read_only_fields = ["id", "created_by"]
 
-    def validate_start_date(self, data):
-        """validates start date with current and end date
-
-        Raises:
-            serializers.ValidationError: raises if start date is not valid
-
-        Returns:
-            Date: start_date
-        """        
-        start_date = self.initial_data.get("start_date")
-        start_date = datetime.strptime(start_date, "%Y-%m-%dT%H:%M:%SZ")
-        if start_date <= datetime.now(): 
-            raise serializers.ValidationError("Start date must be in future.")
-        return start_date
-
-    def validate_end_date(self, data):
-        """validates end date with current and Start date
-
-        Raises:
-            serializers.ValidationError: raises if end date is not valid
-
-        Returns:
-            Date: end_date
-        """        
-        end_date = self.initial_data.get("end_date")
-        end_date = datetime.strptime(end_date, "%Y-%m-%dT%H:%M:%SZ")
-        start_date = self.initial_data.get("start_date")
-        start_date = datetime.strptime(start_date, "%Y-%m-%dT%H:%M:%SZ")
-        if start_date >= end_date:
-            raise serializers.ValidationError("End date should be after start date.")
-        return end_date
-
     def validate(self, data):
-        """validates all the Trip data.
+        """validates start date with current date and end date with start date, both already parsed by the date fields.
 
         Args:
             data (dictionary): data of trip to be created 
 
+        Raises:
+            serializers.ValidationError: raises if start date or end date is not valid
+
         Returns:
             object: validated trip data 
         """
+        start_date = data.get("start_date")
+        if start_date is not None and start_date <= timezone.now():
+            raise serializers.ValidationError(
+                {"start_date": "Start date must be in future."}
+            )
+
+        start_date = start_date or getattr(self.instance, "start_date", None)
+        end_date = data.get("end_date") or getattr(self.instance, "end_date", None)
+        if start_date and end_date and start_date >= end_date:
+            raise serializers.ValidationError(
+                {"end_date": "End date should be after start date."}
+            )
         return data
 
     def create(self, validated_data):
@@ -90,12 +74,16 @@ class TripSerializer(serializers.ModelSerializer):
         """        
         attachments = validated_data.pop("files", [])
         departments_data = validated_data.pop("departments", [])
-        trips = Trip.objects.create(**validated_data)
-        for attachment in attachments:
-            Attachments.objects.create(trip=trips, attachment=attachment)
-
-        for department_data in departments_data:
-            trips.departments.add(department_data)
+        with transaction.atomic():
+            trips = Trip.objects.create(**validated_data)
+            Attachments.objects.bulk_create(
+                [
+                    Attachments(trip=trips, attachment=attachment)
+                    for attachment in attachments
+                ],
+                batch_size=100,
+            )
+            trips.departments.add(*departments_data)
 
         return trips
 
@@ -107,6 +95,17 @@ class TripUserSerializer(serializers.ModelSerializer):
         fields = ("id", "trip", "user", "interested")
 
 
+class TripUserEntrySerializer(serializers.Serializer):
+    """Takes user id and their preference for being in trip or not"""
+    user = serializers.IntegerField()
+    interested = serializers.BooleanField(default=True)
+
+
+class TripUserBulkSerializer(serializers.Serializer):
+    """Takes list of users and their preferences to sign them up for a trip at once"""
+    users = TripUserEntrySerializer(many=True, allow_empty=False)
+
+
 class AuthorizationUrlSerializer(serializers.Serializer):
     """Takes authorization url to authorize user of Trip with splitwise"""
     authorization_url = serializers.CharField()
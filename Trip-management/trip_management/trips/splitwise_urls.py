@@ -0,0 +1,20 @@
+from django.urls import path
+from .views import (
+    SplitwiseConnectView,
+    SplitwiseOAuth2CallbackView,
+    SplitwiseAccountView,
+)
+
+urlpatterns = [
+    path(
+        "initiate/",
+        SplitwiseConnectView.as_view(),
+        name="splitwise_oauth2_initiate",
+    ),
+    path(
+        "callback/",
+        SplitwiseOAuth2CallbackView.as_view(),
+        name="splitwise_oauth2_callback",
+    ),
+    path("account/", SplitwiseAccountView.as_view(), name="splitwise_account"),
+]
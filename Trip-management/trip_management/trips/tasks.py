@@ -1,31 +1,137 @@
-from datetime import datetime, timedelta
-from django.utils import timezone
-from celery import shared_task
-from django.core.mail import send_mail
-from .models import Trip, TripUsers
-from django.conf import settings
+from datetime import datetime, time, timedelta
+from smtplib import SMTPException
+from celery import group, shared_task
+from django.core.mail import EmailMessage, get_connection
+from .models import TripUsers
 from authentication.models import Users
+from django.conf import settings
+from requests import RequestException
+from splitwise import Splitwise
+from splitwise.exception import SplitwiseException
+from splitwise.user import User
+from zoneinfo import ZoneInfo
 import logging
-import pytz
+
+logger = logging.getLogger(__name__)
+
+IST = ZoneInfo("Asia/Kolkata")
+
+REMINDER_BATCH_SIZE = 100
 
 
 @shared_task(name="email_reminder")
 def send_trip_reminder_emails():
-    """Takes date of next day and fetches all the trips of that day to send mail. Scheduled to run at 1am daily."""
-    india_timezone = pytz.timezone("Asia/Kolkata")
-    now = datetime.now(india_timezone)
+    """Takes date of next day and fetches interested users of all the trips of that day and queues reminder mails for them in batches. Scheduled to run at 1am daily."""
+    now = datetime.now(IST)
     date_today = now.date()
     date_tomorrow = date_today + timedelta(days=1)
-    trips = Trip.objects.filter(start_date__date=date_tomorrow)
-    for trip in trips:
-        trip_users = TripUsers.objects.filter(trip_id=trip.id, interested=True)
-        for trip_user in trip_users:
-            user = Users.objects.get(id=trip_user.user_id)
-            subject = f"Trip Reminder: {trip.title}"
-            message = f"Dear {user.username}, your trip '{trip.title}' is scheduled to start at '{trip.start_date}'."
-            logging.info(
+    tomorrow_start = datetime.combine(date_tomorrow, time.min, tzinfo=IST)
+    tomorrow_end = tomorrow_start + timedelta(days=1)
+    trip_user_ids = TripUsers.objects.filter(
+        trip__start_date__gte=tomorrow_start,
+        trip__start_date__lt=tomorrow_end,
+        interested=True,
+    ).values_list("id", flat=True)
+    batches = []
+    batch = []
+    reminders_count = 0
+    for trip_user_id in trip_user_ids.iterator(chunk_size=500):
+        reminders_count += 1
+        batch.append(trip_user_id)
+        if len(batch) == REMINDER_BATCH_SIZE:
+            batches.append(send_trip_reminder_batch.s(batch))
+            batch = []
+    if batch:
+        batches.append(send_trip_reminder_batch.s(batch))
+    if batches:
+        group(batches).apply_async()
+    logger.info(
+        "queued %d trip reminders in %d batches", reminders_count, len(batches)
+    )
+
+
+@shared_task(bind=True, name="email_reminder_batch", max_retries=3)
+def send_trip_reminder_batch(self, trip_user_ids):
+    """Sends reminder mails to given trip users over a single SMTP connection. Only recipients whose mail failed are retried."""
+    trip_users = TripUsers.objects.filter(id__in=trip_user_ids).values(
+        "id",
+        "trip_id",
+        "trip__title",
+        "trip__start_date",
+        "user__username",
+        "user__email",
+    )
+    messages = []
+    for trip_user in trip_users:
+        subject = f"Trip Reminder: {trip_user['trip__title']}"
+        message = f"Dear {trip_user['user__username']}, your trip '{trip_user['trip__title']}' is scheduled to start at '{trip_user['trip__start_date']}'."
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(
                 "current processing trip user is %s, trip id is %d",
-                trip_user.id,
-                trip.id,
+                trip_user["id"],
+                trip_user["trip_id"],
+            )
+        messages.append(
+            (
+                trip_user["id"],
+                EmailMessage(
+                    subject,
+                    message,
+                    settings.EMAIL_HOST_USER,
+                    [trip_user["user__email"]],
+                ),
             )
-            send_mail(subject, message, settings.EMAIL_HOST_USER, [user.email])
+        )
+
+    connection = get_connection()
+    try:
+        connection.open()
+    except (SMTPException, OSError) as exc:
+        raise self.retry(exc=exc, countdown=2**self.request.retries)
+    failed_ids = []
+    emails_sent = 0
+    try:
+        for trip_user_id, message in messages:
+            try:
+                emails_sent += connection.send_messages([message]) or 0
+            except (SMTPException, OSError) as exc:
+                logger.warning(
+                    "reminder mail to trip user %s failed: %s", trip_user_id, exc
+                )
+                failed_ids.append(trip_user_id)
+    finally:
+        connection.close()
+    logger.info(
+        "reminder batch emails_sent %d, emails_failed %d",
+        emails_sent,
+        len(failed_ids),
+    )
+    if failed_ids:
+        raise self.retry(args=(failed_ids,), countdown=2**self.request.retries)
+
+
+@shared_task(
+    bind=True,
+    name="splitwise_add_user",
+    autoretry_for=(RequestException, SplitwiseException),
+    retry_backoff=True,
+    max_retries=3,
+)
+def add_user_to_splitwise_group(self, created_by_id, group_id, first_name, email):
+    """Adds user to splitwise group of a trip on behalf of the trip creator. Retried if splitwise cannot be reached."""
+    access_token = Users.objects.only("access_token").get(id=created_by_id).access_token
+    splitwise = Splitwise(
+        consumer_key=settings.SPLITWISE_CONSUMER_KEY,
+        consumer_secret=settings.SPLITWISE_CONSUMER_SECRET,
+    )
+    splitwise.setOAuth2AccessToken(
+        {"access_token": access_token, "token_type": "bearer"}
+    )
+    user = User()
+    user.setFirstName(first_name)
+    user.setEmail(email)
+    success, user, errors = splitwise.addUserToGroup(user, group_id)
+    if not success:
+        raise SplitwiseException(
+            f"could not add {email} to splitwise group {group_id}: {errors}"
+        )
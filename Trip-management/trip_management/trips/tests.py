@@ -1,3 +1,23 @@
-from django.test import TestCase
+import json
 
-# Create your tests here.
+from django.test import SimpleTestCase
+from rest_framework import serializers
+from rest_framework.settings import api_settings
+
+
+class FilesSerializer(serializers.Serializer):
+    files = serializers.ListField(child=serializers.FileField())
+
+
+class DefaultRendererTests(SimpleTestCase):
+    """Checks the project's default JSON renderer against DRF's error shapes"""
+
+    def test_renders_list_field_errors_keyed_by_index(self):
+        serializer = FilesSerializer(data={"files": ["notafile"]})
+        self.assertFalse(serializer.is_valid())
+        self.assertIn(0, serializer.errors["files"])
+
+        renderer = api_settings.DEFAULT_RENDERER_CLASSES[0]()
+        rendered = json.loads(renderer.render(serializer.errors))
+
+        self.assertIn("0", rendered["files"])
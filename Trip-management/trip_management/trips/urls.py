@@ -1,19 +1,17 @@
-from rest_framework.routers import DefaultRouter, SimpleRouter
+from rest_framework.routers import SimpleRouter
 from django.urls import path, include
 from .views import (
     TripViewSet,
     MyTripsViewSet,
     TripUsersView,
+    TripUsersBulkView,
     # DeleteTripsViewSet,
     TripSearchViewSet,
-    SplitwiseConnectView,
-    SplitwiseOAuth2CallbackView,
-    SplitwiseAccountView,
     CreateGroupView,
     GroupExpense,
 )
 
-router = DefaultRouter()
+router = SimpleRouter()
 router.register(r"filter/dates", TripSearchViewSet, basename="trip-search-on-date")
 # router.register(r"delete", DeleteTripsViewSet, basename="delete-trips")
 router.register("my-trips", MyTripsViewSet, basename="my-trips")
@@ -22,29 +20,17 @@ router.register("", TripViewSet)
 urlpatterns = [
     path("", include(router.urls)),
     path("interest/<int:id>", TripUsersView.as_view(), name="trip-user-interest"),
+    path(
+        "interest/<int:id>/bulk",
+        TripUsersBulkView.as_view(),
+        name="trip-user-interest-bulk",
+    ),
     path(
         "<int:trip_id>/group/",
         CreateGroupView.as_view(),
         name="create-splitwise-group",
     ),
-    path(
-        "interest/<str:interested>/",
-        TripViewSet.as_view({"get": "interest"}),
-        name="trip-interest",
-    ),
-    path(
-        "splitwise/initiate/",
-        SplitwiseConnectView.as_view(),
-        name="splitwise_oauth2_initiate",
-    ),
-    path(
-        "splitwise/callback/",
-        SplitwiseOAuth2CallbackView.as_view(),
-        name="splitwise_oauth2_callback",
-    ),
-    path(
-        "splitwise/account/", SplitwiseAccountView.as_view(), name="splitwise_account"
-    ),
+    path("splitwise/", include("trips.splitwise_urls")),
     path(
         "group/expenses/",
         GroupExpense.as_view(),
@@ -1,23 +1,24 @@
-from django.shortcuts import get_object_or_404, render
+from django.shortcuts import get_object_or_404
 from django.db.models import Q
 from django.conf import settings
 from django.core.cache import cache
 from django.db import IntegrityError
+from django.forms.models import model_to_dict
 
+from celery import group as celery_group
 from datetime import datetime, timezone
+from decimal import ROUND_DOWN, Decimal
+import hashlib
+import threading
 
-from requests import session
 from splitwise import Splitwise, SplitwiseError
 from splitwise.group import Group
 from splitwise.user import User, ExpenseUser
 from splitwise.expense import Expense
-import pytz
-import json
 
 from rest_framework import viewsets
 from rest_framework.views import APIView
 from rest_framework_simplejwt.authentication import JWTAuthentication
-from rest_framework.parsers import FormParser, MultiPartParser, FileUploadParser
 from rest_framework import permissions, generics
 from rest_framework.response import Response
 from rest_framework import status
@@ -25,16 +26,41 @@ from rest_framework.decorators import action
 from rest_framework import filters
 
 
-from .models import Trip, Attachments, TripUsers
-from authentication.models import Users, Department
+from .models import Trip, TripUsers
+from .tasks import add_user_to_splitwise_group
+from authentication.models import Users
 from .serializers import (
     TripSerializer,
     TripUserSerializer,
+    TripUserBulkSerializer,
     AuthorizationUrlSerializer,
     AccessTokenSerializer,
     ExpenseSerializer,
 )
 
+_splitwise_local = threading.local()
+
+SPLITWISE_ACCOUNT_CACHE_TIMEOUT = 60
+
+
+def get_splitwise_client():
+    """Returns the Splitwise client of the current thread, creating it on first use.
+
+    The client holds the OAuth token of the last request, so callers must set
+    the requesting user's token before making authenticated calls.
+
+    Returns:
+        Splitwise: client configured with the app's consumer credentials.
+    """
+    client = getattr(_splitwise_local, "client", None)
+    if client is None:
+        client = Splitwise(
+            consumer_key=settings.SPLITWISE_CONSUMER_KEY,
+            consumer_secret=settings.SPLITWISE_CONSUMER_SECRET,
+        )
+        _splitwise_local.client = client
+    return client
+
 
 class TripViewSet(viewsets.ModelViewSet):
     """The viewset overrides multiple methods to perform create, update, search operations on trips"""
@@ -42,7 +68,7 @@ class TripViewSet(viewsets.ModelViewSet):
     authentication_classes = [JWTAuthentication]
     permission_classes = [permissions.IsAuthenticated]
     serializer_class = TripSerializer
-    queryset = Trip.objects.all()
+    queryset = Trip.objects.order_by("id")
     filter_backends = [filters.SearchFilter]
     search_fields = ["title", "description"]
 
@@ -61,7 +87,7 @@ class TripViewSet(viewsets.ModelViewSet):
         Returns:
             object: object of queryset having search results.
         """
-        queryset = super().get_queryset()
+        queryset = super().get_queryset().prefetch_related("departments", "users")
 
         search_query = self.request.query_params.get("search", None)
         if search_query:
@@ -98,7 +124,9 @@ class TripViewSet(viewsets.ModelViewSet):
             return Response(serializer.data, status=status.HTTP_202_ACCEPTED)
         return Response(serializer.errors, status=status.HTTP_304_NOT_MODIFIED)
 
-    @action(detail=False, methods=["get"], url_path="interest/(?P<interested>\w+)")
+    @action(
+        detail=False, methods=["get"], url_path=r"interest/(?P<interested>[^/.]+)"
+    )
     def interest(self, request, interested=None):
         """filter trips based on user's selected preference
 
@@ -111,12 +139,20 @@ class TripViewSet(viewsets.ModelViewSet):
         """
 
         if interested == "interested":
-            trips = Trip.objects.filter(
-                Q(trip__user=request.user) & Q(trip__interested=True)
+            trips = (
+                Trip.objects.filter(
+                    Q(trip__user=request.user) & Q(trip__interested=True)
+                )
+                .prefetch_related("departments", "users")
+                .order_by("id")
             )
         elif interested == "not-interested":
-            trips = Trip.objects.filter(
-                Q(trip__user=request.user) & Q(trip__interested=False)
+            trips = (
+                Trip.objects.filter(
+                    Q(trip__user=request.user) & Q(trip__interested=False)
+                )
+                .prefetch_related("departments", "users")
+                .order_by("id")
             )
         else:
             return Response(
@@ -125,8 +161,9 @@ class TripViewSet(viewsets.ModelViewSet):
                 },
                 status=status.HTTP_400_BAD_REQUEST,
             )
-        serializer = self.get_serializer(trips, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        page = self.paginate_queryset(trips)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
 
     def destroy(self, request, *args, **kwargs):
         """Fetches trip using trip_id passed and deletes it if it exists.
@@ -138,28 +175,12 @@ class TripViewSet(viewsets.ModelViewSet):
             JSON: deletion or error message
         """
         trip_id = kwargs.get("pk")
-        try:
-            trip = Trip.objects.get(id=trip_id)
-        except Trip.DoesNotExist:
-            return Response(
-                {"detail": "Trip not found"}, status=status.HTTP_403_FORBIDDEN
-            )
-        else:
-            if trip.created_by == request.user:
-                try:
-                    attachments = Attachments.objects.filter(trip=trip)
-                    attachments.delete()
-                    trip.delete()
-                    return Response(
-                        {"detail": "Trip deleted"}, status=status.HTTP_204_NO_CONTENT
-                    )
-                except:
-                    return Response(
-                        {"detail": "Trip not found"}, status=status.HTTP_404_NOT_FOUND
-                    )
+        deleted, _ = Trip.objects.filter(id=trip_id, created_by=request.user).delete()
+        if deleted:
             return Response(
-                {"detail": "Trip not found"}, status=status.HTTP_403_FORBIDDEN
+                {"detail": "Trip deleted"}, status=status.HTTP_204_NO_CONTENT
             )
+        return Response({"detail": "Trip not found"}, status=status.HTTP_403_FORBIDDEN)
 
 
 class TripUsersView(generics.CreateAPIView, generics.RetrieveUpdateAPIView):
@@ -180,10 +201,17 @@ class TripUsersView(generics.CreateAPIView, generics.RetrieveUpdateAPIView):
             JSON: success or error message.
         """
         trip_id = kwargs.get("id")
-        trip = Trip.objects.get(id=trip_id)
-        local_datetime = datetime.now()
-        utc_datetime = local_datetime.astimezone(timezone.utc)
-        if trip.start_date <= utc_datetime:
+        try:
+            trip = (
+                Trip.objects.only("start_date", "splitwise_group", "created_by")
+                .prefetch_related("departments")
+                .get(id=trip_id)
+            )
+        except Trip.DoesNotExist:
+            return Response(
+                {"message": "Invalid trip id."}, status=status.HTTP_400_BAD_REQUEST
+            )
+        if trip.start_date <= datetime.now(timezone.utc):
             return Response(
                 {"message": "Trip have already started or completed"},
                 status=status.HTTP_400_BAD_REQUEST,
@@ -194,49 +222,31 @@ class TripUsersView(generics.CreateAPIView, generics.RetrieveUpdateAPIView):
         data["user"] = user_id
         data["trip"] = trip_id
 
-        try:
-            trip = Trip.objects.get(id=trip_id)
-            creator = trip.created_by
-            creator_user = Users.objects.get(id=creator.id)
-            if request.user.department in trip.departments.all():
-                try:
-                    trip_user = TripUsers.objects.create(
-                        trip_id=trip_id, user_id=user_id, interested=interested
-                    )
-                except IntegrityError:
-                    return Response({"message":"Can't make a new entry for same user id and trip id"})
-                # breakpoint()
-                if trip.splitwise_group and interested == "True":
-                    splitwise = Splitwise(
-                        consumer_key=settings.SPLITWISE_CONSUMER_KEY,
-                        consumer_secret=settings.SPLITWISE_CONSUMER_SECRET,
-                    )
-                    access_dict = {
-                        "access_token": creator_user.access_token,
-                        "token_type": "bearer",
-                    }
-                    splitwise.setOAuth2AccessToken(access_dict)
-                    user = User()
-                    user.setFirstName(request.user.first_name)
-                    user.setEmail(request.user.email)
-
-                    success, user, errors = splitwise.addUserToGroup(
-                        user, trip.splitwise_group
-                    )
-                    return Response(
-                        {"message": "Interest added and you have been added to expense group of the trip"}, status=status.HTTP_200_OK
-                    )
-                return Response(
-                    {"message": "Interest added."}, status=status.HTTP_201_CREATED
+        trip_department_ids = {department.id for department in trip.departments.all()}
+        if request.user.department_id in trip_department_ids:
+            try:
+                trip_user = TripUsers.objects.create(
+                    trip_id=trip_id, user_id=user_id, interested=interested
+                )
+            except IntegrityError:
+                return Response({"message":"Can't make a new entry for same user id and trip id"})
+            if trip.splitwise_group and interested == "True":
+                add_user_to_splitwise_group.delay(
+                    trip.created_by_id,
+                    trip.splitwise_group,
+                    request.user.first_name,
+                    request.user.email,
                 )
-            else:
                 return Response(
-                    {"message": "Invalid user or department."},
-                    status=status.HTTP_400_BAD_REQUEST,
+                    {"message": "Interest added and you will be added to expense group of the trip"}, status=status.HTTP_202_ACCEPTED
                 )
-        except Trip.DoesNotExist:
             return Response(
-                {"message": "Invalid trip id."}, status=status.HTTP_400_BAD_REQUEST
+                {"message": "Interest added."}, status=status.HTTP_201_CREATED
+            )
+        else:
+            return Response(
+                {"message": "Invalid user or department."},
+                status=status.HTTP_400_BAD_REQUEST,
             )
 
     def update(self, request, *args, **kwargs):
@@ -249,50 +259,132 @@ class TripUsersView(generics.CreateAPIView, generics.RetrieveUpdateAPIView):
             JSON: success or error message.
         """
         trip_id = kwargs.get("id")
-        trip = Trip.objects.get(id=trip_id)
-        local_datetime = datetime.now()
-        utc_datetime = local_datetime.astimezone(timezone.utc)
-        if trip.start_date <= utc_datetime:
+        trip_user = (
+            TripUsers.objects.select_related("trip")
+            .filter(trip_id=trip_id, user_id=request.user.id)
+            .first()
+        )
+        if trip_user is None:
+            return Response(
+                {"message": "Invalid user or trip id."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        trip = trip_user.trip
+        if trip.start_date <= datetime.now(timezone.utc):
             return Response(
                 {"message": "Trip have already started or completed"},
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        trip_user = TripUsers.objects.get(trip=trip_id, user=request.user.id)
+        user_interest = request.data
+        if user_interest["interested"] == "True" and trip.splitwise_group:
+            add_user_to_splitwise_group.delay(
+                trip.created_by_id,
+                trip.splitwise_group,
+                request.user.first_name,
+                request.user.email,
+            )
+        serializer = self.serializer_class(
+            instance=trip_user, data=request.data, partial=True
+        )
+        serializer.is_valid(raise_exception=True)
+        trip_user = serializer.save()
+        return Response(
+            model_to_dict(trip_user, fields=TripUserSerializer.Meta.fields),
+            status=status.HTTP_200_OK,
+        )
 
-        if trip_user:
-            creator = trip.created_by
-            creator_user = Users.objects.get(id=creator.id)
-            user_interest = request.data
-            if user_interest["interested"] == "True" and trip.splitwise_group:
-                splitwise = Splitwise(
-                    consumer_key=settings.SPLITWISE_CONSUMER_KEY,
-                    consumer_secret=settings.SPLITWISE_CONSUMER_SECRET,
-                )
-                access_dict = {
-                    "access_token": creator_user.access_token,
-                    "token_type": "bearer",
-                }
-                splitwise.setOAuth2AccessToken(access_dict)
-                user = User()
-                user.setFirstName(request.user.first_name)
-                user.setEmail(request.user.email)
-
-                success, user, errors = splitwise.addUserToGroup(
-                    user, trip.splitwise_group
-                )
-            serializer = self.serializer_class(
-                instance=trip_user, data=request.data, partial=True
+
+class TripUsersBulkView(APIView):
+    """Signs up a party of users for a trip and adds the interested ones to its splitwise group"""
+
+    authentication_classes = [JWTAuthentication]
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request, id):
+        """gets list of user ids with their preferences and stores them for the trip in one insert.
+
+        Args:
+            request (object): contains requesting user object and list of users.
+            id (int): id of trip created by requesting user.
+
+        Returns:
+            JSON: success or error message.
+        """
+        try:
+            trip = (
+                Trip.objects.only("start_date", "splitwise_group")
+                .prefetch_related("departments")
+                .get(id=id, created_by=request.user)
             )
-            serializer.is_valid(raise_exception=True)
-            serializer.save()
-            return Response(serializer.data, status=status.HTTP_200_OK)
-        else:
+        except Trip.DoesNotExist:
             return Response(
-                {"message": "Invalid user or trip id."},
+                {"message": "Trip not found."}, status=status.HTTP_404_NOT_FOUND
+            )
+        if trip.start_date <= datetime.now(timezone.utc):
+            return Response(
+                {"message": "Trip have already started or completed"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        serializer = TripUserBulkSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        preferences = {
+            entry["user"]: entry["interested"]
+            for entry in serializer.validated_data["users"]
+        }
+
+        trip_department_ids = {department.id for department in trip.departments.all()}
+        users = (
+            Users.objects.filter(department_id__in=trip_department_ids)
+            .only("id", "first_name", "email")
+            .in_bulk(list(preferences))
+        )
+        invalid_user_ids = sorted(set(preferences) - set(users))
+        if invalid_user_ids:
+            return Response(
+                {"message": "Invalid user or department.", "users": invalid_user_ids},
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
+        skipped_user_ids = sorted(
+            TripUsers.objects.filter(
+                trip_id=trip.id, user_id__in=list(preferences)
+            ).values_list("user_id", flat=True)
+        )
+        for user_id in skipped_user_ids:
+            del preferences[user_id]
+
+        TripUsers.objects.bulk_create(
+            [
+                TripUsers(trip_id=trip.id, user_id=user_id, interested=interested)
+                for user_id, interested in preferences.items()
+            ],
+            ignore_conflicts=True,
+        )
+
+        if trip.splitwise_group and any(preferences.values()):
+            celery_group(
+                add_user_to_splitwise_group.s(
+                    request.user.id,
+                    trip.splitwise_group,
+                    users[user_id].first_name,
+                    users[user_id].email,
+                )
+                for user_id, interested in preferences.items()
+                if interested
+            ).apply_async()
+
+        return Response(
+            {
+                "message": "Interests added.",
+                "users": sorted(preferences),
+                "skipped_users": skipped_user_ids,
+            },
+            status=status.HTTP_201_CREATED if preferences else status.HTTP_200_OK,
+        )
+
 
 class MyTripsViewSet(viewsets.ModelViewSet):
     """Gets list of trips created by requesting user."""
@@ -308,7 +400,11 @@ class MyTripsViewSet(viewsets.ModelViewSet):
             Object: Trip objects
         """
         user = self.request.user
-        return Trip.objects.filter(created_by=user).prefetch_related("attachments")
+        return (
+            Trip.objects.filter(created_by=user)
+            .prefetch_related("departments", "users")
+            .order_by("id")
+        )
 
     def list(self, request, *args, **kwargs):
         """takes queryset containing multiple trip objects to serialize them and return.
@@ -317,8 +413,9 @@ class MyTripsViewSet(viewsets.ModelViewSet):
             JSON: list of trips created by requesting user
         """
         queryset = self.get_queryset()
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+        page = self.paginate_queryset(queryset)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
 
 
 class TripSearchViewSet(viewsets.ModelViewSet):
@@ -337,17 +434,17 @@ class TripSearchViewSet(viewsets.ModelViewSet):
         """
         start_date = self.request.query_params.get("start_date", None)
         end_date = self.request.query_params.get("end_date", None)
-        query = Q(departments=self.request.user.department)
-        if not start_date and not end_date:
-            return Trip.objects.filter(query)
-        elif start_date and not end_date:
+        query = Q(departments=self.request.user.department_id)
+        if start_date:
             query &= Q(start_date__gte=start_date)
-        elif not start_date and end_date:
-            return Trip.objects.filter(start_date__lte=end_date)
-        else:
-            query &= Q(start_date__range=[start_date, end_date])
+        if end_date:
+            query &= Q(start_date__lte=end_date)
 
-        return Trip.objects.filter(query)
+        return (
+            Trip.objects.filter(query)
+            .prefetch_related("departments", "users")
+            .order_by("id")
+        )
 
 
 class SplitwiseConnectView(APIView):
@@ -365,13 +462,10 @@ class SplitwiseConnectView(APIView):
         Returns:
             JSON: Authorization url
         """
-        splitwise = Splitwise(
-            consumer_key=settings.SPLITWISE_CONSUMER_KEY,
-            consumer_secret=settings.SPLITWISE_CONSUMER_SECRET,
-        )
+        splitwise = get_splitwise_client()
 
         url, state = splitwise.getOAuth2AuthorizeURL(settings.SPLITWISE_REDIRECT_URI)
-        cache.set(state, request.user)
+        cache.set(state, request.user.id, timeout=600)
         serializer = AuthorizationUrlSerializer({"authorization_url": url})
         return Response(serializer.data)
 
@@ -393,10 +487,7 @@ class SplitwiseOAuth2CallbackView(APIView):
         """
         authorization_code = request.GET.get("code")
         state = request.GET.get("state")
-        splitwise = Splitwise(
-            consumer_key=settings.SPLITWISE_CONSUMER_KEY,
-            consumer_secret=settings.SPLITWISE_CONSUMER_SECRET,
-        )
+        splitwise = get_splitwise_client()
 
         access_token_dict = splitwise.getOAuth2AccessToken(
             authorization_code, settings.SPLITWISE_REDIRECT_URI
@@ -406,11 +497,13 @@ class SplitwiseOAuth2CallbackView(APIView):
         splitwise.setOAuth2AccessToken(access_dict)
         user_detail = splitwise.getCurrentUser()
         splitwise_id = user_detail.id
-        user = cache.get(state)
+        user = get_object_or_404(Users, id=cache.get(state))
         user.access_token = access_token
         user.splitwise_id = splitwise_id
         user.flag = True
-        user.save()
+        user.save(
+            update_fields=["access_token", "splitwise_id", "flag", "modified_at"]
+        )
 
         serializer = AccessTokenSerializer(
             {"message": "Access token stored successfully."}
@@ -433,11 +526,15 @@ class SplitwiseAccountView(APIView):
         Returns:
             JSON: user data of splitwise account.
         """
-        splitwise = Splitwise(
-            consumer_key=settings.SPLITWISE_CONSUMER_KEY,
-            consumer_secret=settings.SPLITWISE_CONSUMER_SECRET,
-        )
         access_token = request.user.access_token
+        cache_key = "splitwise_me:%s" % hashlib.sha1(
+            str(access_token).encode()
+        ).hexdigest()
+        data = cache.get(cache_key)
+        if data is not None:
+            return Response(data)
+
+        splitwise = get_splitwise_client()
         access_dict = {"access_token": access_token, "token_type": "bearer"}
         splitwise.setOAuth2AccessToken(access_dict)
         user_detail = splitwise.getCurrentUser()
@@ -455,6 +552,7 @@ class SplitwiseAccountView(APIView):
             "date_format": user_detail.date_format,
             "default_group_id": user_detail.default_group_id,
         }
+        cache.set(cache_key, data, timeout=SPLITWISE_ACCOUNT_CACHE_TIMEOUT)
         return Response(data)
 
 
@@ -476,23 +574,26 @@ class CreateGroupView(APIView):
         """
         access_token = request.user.access_token
         access_dict = {"access_token": access_token, "token_type": "bearer"}
-        splitwise = Splitwise(
-            consumer_key=settings.SPLITWISE_CONSUMER_KEY,
-            consumer_secret=settings.SPLITWISE_CONSUMER_SECRET,
-        )
+        splitwise = get_splitwise_client()
         splitwise.setOAuth2AccessToken(access_dict)
-        trip_obj = Trip.objects.get(id=trip_id)
-        if not trip_obj:
-            return Response({"message": "Invalid trip id"})
+        trip_obj = Trip.objects.filter(id=trip_id).only("title").first()
+        if trip_obj is None:
+            return Response(
+                {"message": "Invalid trip id"}, status=status.HTTP_400_BAD_REQUEST
+            )
         group_name = trip_obj.title
         group = Group()
         group.setName(group_name)
 
-        trip_users = TripUsers.objects.filter(Q(trip_id=trip_id) & Q(interested=True))
+        trip_users = (
+            TripUsers.objects.filter(trip_id=trip_id, interested=True)
+            .select_related("user")
+            .only("user__first_name", "user__last_name", "user__email")
+        )
         members = []
         for trip_user in trip_users:
             user = User()
-            group_member = Users.objects.get(id=trip_user.user_id)
+            group_member = trip_user.user
             user.setFirstName(group_member.first_name)
             user.setLastName(group_member.last_name)
             user.setEmail(group_member.email)
@@ -502,14 +603,84 @@ class CreateGroupView(APIView):
         try:
             group, error = splitwise.createGroup(group)
             group_id = group.getId()
-            trip = Trip.objects.get(id=trip_id)
-            trip.splitwise_group = group_id
-            trip.save()
+            trip_obj.splitwise_group = group_id
+            trip_obj.save(update_fields=["splitwise_group", "modified_at"])
             return Response({"group_id": group_id})
         except SplitwiseError as e:
             return Response({"error": str(e)})
 
 
+def _build_expense_users(users, equal_cost=None):
+    """Builds splitwise expense users from the given user shares with a single users query.
+
+    Args:
+        users (list): dicts of user id, paid share and owed share.
+        equal_cost (Decimal): Default none, cost to be split equally instead of using owed shares.
+
+    Returns:
+        list: splitwise expense user objects.
+    """
+    users_map = Users.objects.only("first_name", "last_name", "email").in_bulk(
+        [user_details["user_id"] for user_details in users]
+    )
+    if equal_cost is None:
+        owed_shares = [user_details["owed_share"] for user_details in users]
+    else:
+        equal_share = (equal_cost / len(users)).quantize(
+            Decimal("0.01"), rounding=ROUND_DOWN
+        )
+        owed_shares = [equal_share] * len(users)
+        owed_shares[0] += equal_cost - equal_share * len(users)
+
+    expense_users = []
+    for user_details, owed_share in zip(users, owed_shares):
+        User = users_map[user_details["user_id"]]
+        expenseUser = ExpenseUser()
+        expenseUser.setFirstName(User.first_name)
+        expenseUser.setLastName(User.last_name)
+        expenseUser.setEmail(User.email)
+        expenseUser.setPaidShare(user_details["paid_share"])
+        expenseUser.setOwedShare(owed_share)
+        expense_users.append(expenseUser)
+    return expense_users
+
+
+def _serialize_expense(expense):
+    """Builds response data of an expense returned by splitwise.
+
+    Args:
+        expense (object): splitwise expense object.
+
+    Returns:
+        dict: expense details with its users and repayments.
+    """
+    return {
+        "expense_id": expense.id,
+        "cost": expense.cost,
+        "description": expense.description,
+        "group_id": expense.group_id,
+        "users": [
+            {
+                "id": user.id,
+                "first_name": user.first_name,
+                "last_name": user.last_name,
+                "paid_share": user.paid_share,
+                "owed_share": user.owed_share,
+                "balance": user.net_balance,
+            }
+            for user in expense.users
+        ],
+        "repayments": [
+            {
+                "from_user": repayment.fromUser,
+                "to_user": repayment.toUser,
+                "amount": repayment.amount,
+            }
+            for repayment in expense.repayments
+        ],
+    }
+
+
 class GroupExpense(APIView):
     """Adds expense to the group"""
 
@@ -538,39 +709,15 @@ class GroupExpense(APIView):
 
             access_token = request.user.access_token
             access_dict = {"access_token": access_token, "token_type": "bearer"}
-            splitwise = Splitwise(
-                consumer_key=settings.SPLITWISE_CONSUMER_KEY,
-                consumer_secret=settings.SPLITWISE_CONSUMER_SECRET,
-            )
+            splitwise = get_splitwise_client()
             splitwise.setOAuth2AccessToken(access_dict)
             expense = Expense()
             expense.setGroupId(group_id)
             expense.setDescription(description)
             expense.setCost(cost)
-            breakpoint()
-            if split_equally == False:
-                for user_details in users:
-                    user_id = user_details["user_id"]
-                    User = Users.objects.get(id=user_id)
-                    expenseUser = ExpenseUser()
-                    expenseUser.setFirstName(User.first_name)
-                    expenseUser.setLastName(User.last_name)
-                    expenseUser.setEmail(User.email)
-                    expenseUser.setPaidShare(user_details["paid_share"])
-                    expenseUser.setOwedShare(user_details["owed_share"])
-                    expense.addUser(expenseUser)
-            else:
-                equal_shares = cost / (len(users))
-                for user_details in users:
-                    user_id = user_details["user_id"]
-                    User = Users.objects.get(id=user_id)
-                    expenseUser = ExpenseUser()
-                    expenseUser.setFirstName(User.first_name)
-                    expenseUser.setLastName(User.last_name)
-                    expenseUser.setEmail(User.email)
-                    expenseUser.setPaidShare(user_details["paid_share"])
-                    expenseUser.setOwedShare(equal_shares)
-                    expense.addUser(expenseUser)
+            equal_cost = cost if split_equally else None
+            for expenseUser in _build_expense_users(users, equal_cost=equal_cost):
+                expense.addUser(expenseUser)
 
             nExpense, errors = splitwise.createExpense(expense)
 
@@ -578,39 +725,7 @@ class GroupExpense(APIView):
                 errors = vars(errors)
                 return Response(errors)
 
-            users_list = []
-            repayment_list = []
-            data = {
-                "expense_id": nExpense.id,
-                "cost": nExpense.cost,
-                "description": nExpense.description,
-                "group_id": nExpense.group_id,
-            }
-            for i in nExpense.users:
-                user_json = vars(i)
-                user_dict = {
-                    "id": user_json["id"],
-                    "first_name": user_json["first_name"],
-                    "last-name": user_json["last_name"],
-                    "paid_share": user_json["paid_share"],
-                    "owed_share": user_json["owed_share"],
-                    "balance": user_json["net_balance"],
-                }
-                users_list.append(user_dict)
-
-            data["users"] = users_list
-
-            for i in nExpense.repayments:
-                repayments_json = vars(i)
-                repayments_dict = {
-                    "from_user": repayments_json["fromUser"],
-                    "to_user": repayments_json["toUser"],
-                    "amount": repayments_json["amount"],
-                }
-                repayment_list.append(repayments_dict)
-
-            data["repayments"] = repayment_list
-            return Response(data)
+            return Response(_serialize_expense(nExpense))
 
         else:
             return Response(
@@ -637,25 +752,14 @@ class GroupExpense(APIView):
 
             access_token = request.user.access_token
             access_dict = {"access_token": access_token, "token_type": "bearer"}
-            splitwise = Splitwise(
-                consumer_key=settings.SPLITWISE_CONSUMER_KEY,
-                consumer_secret=settings.SPLITWISE_CONSUMER_SECRET,
-            )
+            splitwise = get_splitwise_client()
             splitwise.setOAuth2AccessToken(access_dict)
 
             expense_id = request.GET.get("expense_id")
             expense = Expense()
             expense.id = expense_id
 
-            for user_details in users:
-                user_id = user_details["user_id"]
-                User = Users.objects.get(id=user_id)
-                expenseUser = ExpenseUser()
-                expenseUser.setFirstName(User.first_name)
-                expenseUser.setLastName(User.last_name)
-                expenseUser.setEmail(User.email)
-                expenseUser.setPaidShare(user_details["paid_share"])
-                expenseUser.setOwedShare(user_details["owed_share"])
+            for expenseUser in _build_expense_users(users):
                 expense.addUser(expenseUser)
 
             nExpense, errors = splitwise.updateExpense(expense)
@@ -663,39 +767,7 @@ class GroupExpense(APIView):
                 errors = vars(errors)
                 return Response(errors)
 
-            users_list = []
-            repayment_list = []
-            data = {
-                "expense_id": nExpense.id,
-                "cost": nExpense.cost,
-                "description": nExpense.description,
-                "group_id": nExpense.group_id,
-            }
-            for i in nExpense.users:
-                user_json = vars(i)
-                user_dict = {
-                    "id": user_json["id"],
-                    "first_name": user_json["first_name"],
-                    "last-name": user_json["last_name"],
-                    "paid_share": user_json["paid_share"],
-                    "owed_share": user_json["owed_share"],
-                    "balance": user_json["net_balance"],
-                }
-                users_list.append(user_dict)
-
-            data["users"] = users_list
-
-            for i in nExpense.repayments:
-                repayments_json = vars(i)
-                repayments_dict = {
-                    "from_user": repayments_json["fromUser"],
-                    "to_user": repayments_json["toUser"],
-                    "amount": repayments_json["amount"],
-                }
-                repayment_list.append(repayments_dict)
-
-            data["repayments"] = repayment_list
-            return Response(data)
+            return Response(_serialize_expense(nExpense))
 
         else:
             return Response(
@@ -713,10 +785,7 @@ class GroupExpense(APIView):
         """
         access_token = request.user.access_token
         access_dict = {"access_token": access_token, "token_type": "bearer"}
-        splitwise = Splitwise(
-            consumer_key=settings.SPLITWISE_CONSUMER_KEY,
-            consumer_secret=settings.SPLITWISE_CONSUMER_SECRET,
-        )
+        splitwise = get_splitwise_client()
         splitwise.setOAuth2AccessToken(access_dict)
         expense_id = request.GET.get("expense_id")
 